@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message, Update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import db
+from .utils import (
+    ALREADY_REGISTERED_TEXT,
+    BRUTE_FORCE_LIMIT,
+    BRUTE_FORCE_WINDOW,
+    REGISTER_USAGE_TEXT,
+    REGISTERED_TEXT,
+    SUCCESS_COOLDOWN,
+    code_accepted_text,
+    code_failure_text,
+    compute_cooldown,
+)
+
+logger = logging.getLogger(__name__)
+
+CATCHUP_THRESHOLD = int(os.getenv("CATCHUP_THRESHOLD", "30"))
+UPDATES_PAGE_SIZE = 100
+SEND_ATTEMPTS = 3
+FETCH_ATTEMPTS = 3
+FETCH_RETRY_DELAY = 1.0
+
+
+@dataclass
+class UserState:
+    user: Optional[db.User] = None
+    last_action: Optional[db.History] = None
+    failures: list[datetime] = field(default_factory=list)
+
+
+def message_time(message: Message) -> datetime:
+    return message.date.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def command_name(text: str) -> Optional[str]:
+    if not text.startswith("/"):
+        return None
+    return text.split(maxsplit=1)[0][1:].split("@", 1)[0]
+
+
+def is_batchable(update: Update) -> bool:
+    message = update.message
+    if not message or not message.text or not message.from_user:
+        return False
+    text = message.text.strip()
+    command = command_name(text)
+    if command is None:
+        return True
+    # "/register@name" is left to the dispatcher, whose Command filter checks the mention.
+    return command == "register" and "@" not in text.split(maxsplit=1)[0]
+
+
+def dedupe_updates(updates: Iterable[Update], after: Optional[int] = None) -> list[Update]:
+    unique = {
+        update.update_id: update
+        for update in updates
+        if after is None or update.update_id > after
+    }
+    return [unique[update_id] for update_id in sorted(unique)]
+
+
+async def load_states(session: AsyncSession, updates: list[Update]) -> dict[int, UserState]:
+    user_ids = {update.message.from_user.id for update in updates}
+    oldest = min(message_time(update.message) for update in updates)
+    users = await db.get_users(session, user_ids)
+    states = {user_id: UserState(user=users.get(user_id)) for user_id in user_ids}
+    since = oldest - max(SUCCESS_COOLDOWN, BRUTE_FORCE_WINDOW)
+    for action in await db.get_code_actions_since(session, user_ids, since):
+        state = states[action.user_id]
+        state.last_action = action
+        if action.result == "failure":
+            state.failures.append(action.timestamp)
+    return states
+
+
+async def resolve_code_entry(
+    session: AsyncSession,
+    state: UserState,
+    message: Message,
+    codes: dict[str, db.Code],
+    season_active: bool,
+) -> str:
+    text = message.text.strip()
+    sent_at = message_time(message)
+
+    async def log_code(result: str, reason: str) -> None:
+        state.last_action = await db.log_action(
+            session, message.from_user.id, text, result, reason, "code_entry", timestamp=sent_at
+        )
+        if result == "failure":
+            state.failures.append(sent_at)
+
+    if not state.user:
+        await log_code("failure", "not_registered")
+        return code_failure_text("not_registered")
+    if not season_active:
+        await log_code("failure", "no_active_season")
+        return code_failure_text("no_active_season")
+    cooldown = compute_cooldown(state.last_action, now=sent_at)
+    if cooldown:
+        await log_code("failure", "cooldown")
+        return code_failure_text("cooldown", cooldown)
+    window_start = sent_at - BRUTE_FORCE_WINDOW
+    if sum(1 for failed_at in state.failures if failed_at >= window_start) >= BRUTE_FORCE_LIMIT:
+        await log_code("failure", "bruteforce_limit")
+        return code_failure_text("bruteforce_limit")
+    code = codes.get(text)
+    if not code or code.is_used:
+        reason = "invalid_code" if not code else "code_used"
+        await log_code("failure", reason)
+        return code_failure_text(reason)
+    code.is_used = True
+    state.user.total_points += code.points
+    await log_code("success", "code_accepted")
+    return code_accepted_text(code.points, state.user.total_points)
+
+
+async def resolve_registration(session: AsyncSession, state: UserState, message: Message) -> str:
+    args = message.text.strip().split(maxsplit=1)
+    if len(args) < 2:
+        return REGISTER_USAGE_TEXT
+    if state.user:
+        return ALREADY_REGISTERED_TEXT
+    sent_at = message_time(message)
+    user_id = message.from_user.id
+    state.user = db.User(user_id=user_id, fio=args[1].strip(), total_points=0, created_at=sent_at)
+    session.add(state.user)
+    await db.log_action(session, user_id, None, "success", "registration", "register", timestamp=sent_at)
+    return REGISTERED_TEXT
+
+
+async def resolve_batch(updates: list[Update]) -> list[tuple[int, str]]:
+    """Resolve batchable updates in one transaction, in message order across all users."""
+    updates = sorted(updates, key=lambda update: (update.message.date, update.update_id))
+    replies = []
+    async with db.SessionLocal() as session:
+        states = await load_states(session, updates)
+        codes = await db.get_codes(session, {update.message.text.strip() for update in updates})
+        season_active = await db.get_active_season(session) is not None
+        for update in updates:
+            message = update.message
+            state = states[message.from_user.id]
+            if command_name(message.text.strip()) == "register":
+                answer = await resolve_registration(session, state, message)
+            else:
+                answer = await resolve_code_entry(session, state, message, codes, season_active)
+            replies.append((message.chat.id, answer))
+        await session.commit()
+    for code in codes.values():
+        db.hot.codes[code.code] = code.is_used
+    db.invalidate_leaderboard()
+    return replies
+
+
+async def send_replies(bot: Bot, replies: list[tuple[int, str]]) -> None:
+    for chat_id, answer in replies:
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            try:
+                await bot.send_message(chat_id, answer)
+                break
+            except TelegramRetryAfter as error:
+                if attempt == SEND_ATTEMPTS:
+                    logger.warning(
+                        "Dropped catch-up reply to chat %s after %d rate-limited attempts",
+                        chat_id,
+                        attempt,
+                    )
+                else:
+                    await asyncio.sleep(error.retry_after)
+            except Exception:
+                logger.exception("Dropped catch-up reply to chat %s", chat_id)
+                break
+
+
+async def fetch_updates(bot: Bot, offset: Optional[int], limit: int) -> Optional[list[Update]]:
+    """Call get_updates with a few retries; returns None if Telegram stays unreachable."""
+    for attempt in range(1, FETCH_ATTEMPTS + 1):
+        try:
+            return await bot.get_updates(offset=offset, timeout=0, limit=limit)
+        except Exception:
+            logger.exception("get_updates failed during catch-up (attempt %d)", attempt)
+            if attempt < FETCH_ATTEMPTS:
+                await asyncio.sleep(FETCH_RETRY_DELAY)
+    return None
+
+
+@dataclass
+class Progress:
+    last_update_id: Optional[int] = None
+    handled: int = 0
+    batched: int = 0
+
+
+async def process_page(
+    bot: Bot, dispatcher: Dispatcher, updates: list[Update], progress: Progress
+) -> None:
+    pending: list[Update] = []
+
+    async def flush() -> None:
+        if pending:
+            await send_replies(bot, await resolve_batch(pending))
+            progress.last_update_id = pending[-1].update_id
+            progress.handled += len(pending)
+            progress.batched += len(pending)
+            pending.clear()
+
+    for update in updates:
+        if is_batchable(update):
+            pending.append(update)
+            continue
+        # Commands such as /new_season must see every code sent before them.
+        await flush()
+        try:
+            await dispatcher.feed_update(bot, update)
+        except Exception:
+            # Same as aiogram's polling: a failed handler still counts as processed.
+            logger.exception("Update %d failed during catch-up", update.update_id)
+        progress.last_update_id = update.update_id
+        progress.handled += 1
+    await flush()
+
+
+async def catch_up(bot: Bot, dispatcher: Dispatcher) -> int:
+    """Drain a large pending backlog page by page; returns the number of updates handled.
+
+    Updates are confirmed to Telegram (via the get_updates offset) only after they have
+    been processed. Once a page is shorter than CATCHUP_THRESHOLD, a batch fails to
+    commit or Telegram is unreachable, the remaining updates are left for regular polling.
+    """
+    progress = Progress()
+    while True:
+        offset = progress.last_update_id + 1 if progress.last_update_id is not None else None
+        updates = await fetch_updates(bot, offset, UPDATES_PAGE_SIZE)
+        if updates is None:
+            break
+        page = dedupe_updates(updates, after=progress.last_update_id)
+        if len(page) < CATCHUP_THRESHOLD:
+            break
+        confirmed = progress.last_update_id
+        try:
+            await process_page(bot, dispatcher, page, progress)
+        except Exception:
+            logger.exception("Catch-up failed, falling back to regular polling")
+            if progress.last_update_id != confirmed:
+                await fetch_updates(bot, progress.last_update_id + 1, 1)
+            break
+    if progress.handled:
+        logger.info("Catch-up handled %d updates (%d batched)", progress.handled, progress.batched)
+    return progress.handled
@@ -1,8 +1,12 @@
+import asyncio
+import hashlib
 import os
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import Iterable, Optional
 
 from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, select, func, delete
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -73,13 +77,105 @@ class AdminSession(Base):
     activated_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow)
 
 
+class SchemaMeta(Base):
+    __tablename__ = "schema_meta"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[str] = mapped_column(String(128), nullable=False)
+
+
 engine = create_async_engine(DATABASE_URL, echo=False)
 SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
 
+SCHEMA_FINGERPRINT_KEY = "fingerprint"
+
+
+@dataclass
+class HotState:
+    """In-process cache of frequently read state; the bot runs as a single process."""
+
+    warm: bool = False
+    active_season_id: Optional[int] = None
+    admin_ids: set[int] = field(default_factory=set)
+    codes: dict[str, bool] = field(default_factory=dict)
+    leaderboard: Optional[list[tuple[int, int]]] = None
+    leaderboard_generation: int = 0
+
+
+hot = HotState()
+
+
+def schema_fingerprint() -> str:
+    digest = hashlib.sha256()
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        digest.update(table.name.encode())
+        for column in table.columns:
+            digest.update(
+                f"|{column.name}:{column.type}:{column.nullable}:{column.primary_key}".encode()
+            )
+        digest.update(b";")
+    return digest.hexdigest()
+
 
-async def init_db() -> None:
+async def get_schema_fingerprint() -> Optional[str]:
+    try:
+        async with SessionLocal() as session:
+            meta = await session.get(SchemaMeta, SCHEMA_FINGERPRINT_KEY)
+            return meta.value if meta else None
+    except DBAPIError:
+        return None
+
+
+async def init_db() -> bool:
+    """Create tables unless the stored fingerprint matches. Returns True if create_all ran."""
+    fingerprint = schema_fingerprint()
+    if await get_schema_fingerprint() == fingerprint:
+        return False
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as session:
+        await session.merge(SchemaMeta(key=SCHEMA_FINGERPRINT_KEY, value=fingerprint))
+        await session.commit()
+    return True
+
+
+def invalidate_leaderboard() -> None:
+    hot.leaderboard = None
+    hot.leaderboard_generation += 1
+
+
+async def load_leaderboard(session: AsyncSession) -> list[tuple[int, int]]:
+    generation = hot.leaderboard_generation
+    result = await session.execute(
+        select(User.user_id, User.total_points).order_by(User.total_points.desc(), User.created_at)
+    )
+    leaderboard = [(row.user_id, row.total_points) for row in result]
+    # A write that committed while the query ran makes this result stale; don't cache it.
+    if hot.leaderboard_generation == generation:
+        hot.leaderboard = leaderboard
+    return leaderboard
+
+
+async def warm_up() -> None:
+    async def load_season(session: AsyncSession) -> None:
+        await ensure_active_season(session)
+
+    async def load_admins(session: AsyncSession) -> None:
+        result = await session.execute(select(AdminSession.user_id))
+        hot.admin_ids = set(result.scalars().all())
+
+    async def load_codes(session: AsyncSession) -> None:
+        result = await session.execute(select(Code.code, Code.is_used))
+        hot.codes = {row.code: row.is_used for row in result}
+
+    async def run(loader) -> None:
+        async with SessionLocal() as session:
+            await loader(session)
+
+    # ensure_active_season may write, so it commits before the read-only loaders start.
+    await run(load_season)
+    await asyncio.gather(run(load_admins), run(load_codes), run(load_leaderboard))
+    hot.warm = True
 
 
 async def get_session() -> AsyncSession:
@@ -90,14 +186,20 @@ async def ensure_active_season(session: AsyncSession) -> Season:
     result = await session.execute(select(Season).where(Season.status == "active"))
     season = result.scalars().first()
     if season:
+        hot.active_season_id = season.season_id
         return season
     season = Season()
     session.add(season)
     await session.commit()
+    hot.active_season_id = season.season_id
     return season
 
 
 async def get_active_season(session: AsyncSession) -> Optional[Season]:
+    if hot.warm:
+        if hot.active_season_id is None:
+            return None
+        return await session.get(Season, hot.active_season_id)
     result = await session.execute(select(Season).where(Season.status == "active"))
     return result.scalars().first()
 
@@ -110,6 +212,7 @@ async def register_user(session: AsyncSession, user_id: int, fio: str) -> bool:
     session.add(user)
     await log_action(session, user_id, None, "success", "registration", "register")
     await session.commit()
+    invalidate_leaderboard()
     return True
 
 
@@ -117,12 +220,23 @@ async def get_user(session: AsyncSession, user_id: int) -> Optional[User]:
     return await session.get(User, user_id)
 
 
+async def get_users(session: AsyncSession, user_ids: Iterable[int]) -> dict[int, User]:
+    result = await session.execute(select(User).where(User.user_id.in_(list(user_ids))))
+    return {user.user_id: user for user in result.scalars().all()}
+
+
+async def get_codes(session: AsyncSession, codes: Iterable[str]) -> dict[str, Code]:
+    result = await session.execute(select(Code).where(Code.code.in_(list(codes))))
+    return {code.code: code for code in result.scalars().all()}
+
+
 async def add_code(session: AsyncSession, code: str, points: int) -> bool:
     existing = await session.get(Code, code)
     if existing:
         return False
     session.add(Code(code=code, points=points))
     await session.commit()
+    hot.codes[code] = False
     return True
 
 
@@ -132,6 +246,7 @@ async def delete_code(session: AsyncSession, code: str) -> bool:
         return False
     await session.delete(existing)
     await session.commit()
+    hot.codes.pop(code, None)
     return True
 
 
@@ -142,9 +257,12 @@ async def set_admin_session(session: AsyncSession, user_id: int) -> None:
     else:
         existing.activated_at = utcnow()
     await session.commit()
+    hot.admin_ids.add(user_id)
 
 
 async def is_admin_session(session: AsyncSession, user_id: int) -> bool:
+    if hot.warm:
+        return user_id in hot.admin_ids
     existing = await session.get(AdminSession, user_id)
     return existing is not None
 
@@ -156,9 +274,13 @@ async def log_action(
     result: str,
     reason: str,
     action: str,
-) -> None:
+    timestamp: Optional[datetime] = None,
+) -> History:
     entry = History(user_id=user_id, code=code, result=result, reason=reason, action=action)
+    if timestamp is not None:
+        entry.timestamp = timestamp
     session.add(entry)
+    return entry
 
 
 async def get_last_code_action(session: AsyncSession, user_id: int) -> Optional[History]:
@@ -171,6 +293,21 @@ async def get_last_code_action(session: AsyncSession, user_id: int) -> Optional[
     return result.scalars().first()
 
 
+async def get_code_actions_since(
+    session: AsyncSession, user_ids: Iterable[int], since: datetime
+) -> list[History]:
+    result = await session.execute(
+        select(History)
+        .where(
+            History.user_id.in_(list(user_ids)),
+            History.action == "code_entry",
+            History.timestamp >= since,
+        )
+        .order_by(History.timestamp)
+    )
+    return list(result.scalars().all())
+
+
 async def count_recent_failures(session: AsyncSession, user_id: int, since: datetime) -> int:
     result = await session.execute(
         select(func.count(History.id)).where(
@@ -184,6 +321,11 @@ async def count_recent_failures(session: AsyncSession, user_id: int, since: date
 
 
 async def apply_code(session: AsyncSession, user: User, code_value: str) -> tuple[bool, str, int]:
+    if hot.warm:
+        if code_value not in hot.codes:
+            return False, "invalid_code", 0
+        if hot.codes[code_value]:
+            return False, "code_used", 0
     code = await session.get(Code, code_value)
     if not code:
         return False, "invalid_code", 0
@@ -193,15 +335,18 @@ async def apply_code(session: AsyncSession, user: User, code_value: str) -> tupl
     code.is_used = True
     user.total_points += points
     await session.commit()
+    hot.codes[code_value] = True
+    invalidate_leaderboard()
     return True, "ok", points
 
 
 async def get_ranking(session: AsyncSession, user_id: int) -> tuple[int, int]:
-    result = await session.execute(select(User).order_by(User.total_points.desc(), User.created_at))
-    users = result.scalars().all()
-    for idx, user in enumerate(users, start=1):
-        if user.user_id == user_id:
-            return idx, user.total_points
+    leaderboard = hot.leaderboard
+    if leaderboard is None:
+        leaderboard = await load_leaderboard(session)
+    for idx, (ranked_id, points) in enumerate(leaderboard, start=1):
+        if ranked_id == user_id:
+            return idx, points
     return 0, 0
 
 
@@ -227,6 +372,7 @@ async def delete_user(session: AsyncSession, user_id: int) -> bool:
     await session.execute(delete(Winner).where(Winner.user_id == user_id))
     await session.delete(user)
     await session.commit()
+    invalidate_leaderboard()
     return True
 
 
@@ -249,6 +395,7 @@ async def stop_season(session: AsyncSession) -> list[Winner]:
         session.add(winner)
         winners.append(winner)
     await session.commit()
+    hot.active_season_id = None
     return winners
 
 
@@ -265,6 +412,9 @@ async def start_new_season(session: AsyncSession) -> Season:
     season = Season()
     session.add(season)
     await session.commit()
+    hot.active_season_id = season.season_id
+    hot.codes = {}
+    invalidate_leaderboard()
     return season
 
 
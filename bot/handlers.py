@@ -7,21 +7,23 @@ from aiogram.filters import Command
 from aiogram.types import Message
 
 from . import db
-from .utils import BRUTE_FORCE_LIMIT, BRUTE_FORCE_WINDOW, compute_cooldown
+from .utils import (
+    ALREADY_REGISTERED_TEXT,
+    BRUTE_FORCE_LIMIT,
+    BRUTE_FORCE_WINDOW,
+    NOT_REGISTERED_TEXT,
+    REGISTER_USAGE_TEXT,
+    REGISTERED_TEXT,
+    code_accepted_text,
+    code_failure_text,
+    compute_cooldown,
+)
 
 router = Router()
 
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "")
 
 
-def format_timedelta(delta) -> str:
-    seconds = int(delta.total_seconds())
-    minutes, seconds = divmod(seconds, 60)
-    if minutes:
-        return f"{minutes} мин {seconds} сек"
-    return f"{seconds} сек"
-
-
 async def ensure_admin(message: Message) -> bool:
     async with db.SessionLocal() as session:
         if not await db.is_admin_session(session, message.from_user.id):
@@ -42,18 +44,15 @@ async def start(message: Message) -> None:
 async def register(message: Message) -> None:
     args = message.text.split(maxsplit=1)
     if len(args) < 2:
-        await message.answer("Укажите ФИО: /register Иванов Иван Иванович")
+        await message.answer(REGISTER_USAGE_TEXT)
         return
     fio = args[1].strip()
     async with db.SessionLocal() as session:
         success = await db.register_user(session, message.from_user.id, fio)
     if success:
-        await message.answer(
-            "Регистрация завершена! Данные менять нельзя, поэтому проверьте ФИО.\n"
-            "Теперь отправляйте коды для начисления баллов."
-        )
+        await message.answer(REGISTERED_TEXT)
     else:
-        await message.answer("Вы уже зарегистрированы.")
+        await message.answer(ALREADY_REGISTERED_TEXT)
 
 
 @router.message(Command("myscore"))
@@ -61,7 +60,7 @@ async def myscore(message: Message) -> None:
     async with db.SessionLocal() as session:
         user = await db.get_user(session, message.from_user.id)
         if not user:
-            await message.answer("Сначала зарегистрируйтесь через /register.")
+            await message.answer(NOT_REGISTERED_TEXT)
             return
         rank, points = await db.get_ranking(session, user.user_id)
     await message.answer(f"Ваш счёт: {points} балл(ов). Текущая позиция: {rank}.")
@@ -287,20 +286,20 @@ async def handle_code(message: Message) -> None:
         if not user:
             await db.log_action(session, message.from_user.id, code_value, "failure", "not_registered", "code_entry")
             await session.commit()
-            await message.answer("Сначала зарегистрируйтесь через /register.")
+            await message.answer(code_failure_text("not_registered"))
             return
         active_season = await db.get_active_season(session)
         if not active_season:
             await db.log_action(session, user.user_id, code_value, "failure", "no_active_season", "code_entry")
             await session.commit()
-            await message.answer("Сезон не активен. Ожидайте запуска нового сезона.")
+            await message.answer(code_failure_text("no_active_season"))
             return
         last_action = await db.get_last_code_action(session, user.user_id)
         cooldown = compute_cooldown(last_action)
         if cooldown:
             await db.log_action(session, user.user_id, code_value, "failure", "cooldown", "code_entry")
             await session.commit()
-            await message.answer(f"Попробуйте позже. Осталось ждать: {format_timedelta(cooldown)}.")
+            await message.answer(code_failure_text("cooldown", cooldown))
             return
         failures = await db.count_recent_failures(
             session, user.user_id, datetime.utcnow() - BRUTE_FORCE_WINDOW
@@ -308,17 +307,14 @@ async def handle_code(message: Message) -> None:
         if failures >= BRUTE_FORCE_LIMIT:
             await db.log_action(session, user.user_id, code_value, "failure", "bruteforce_limit", "code_entry")
             await session.commit()
-            await message.answer("Слишком много неудачных попыток. Попробуйте позже.")
+            await message.answer(code_failure_text("bruteforce_limit"))
             return
         success, reason, points = await db.apply_code(session, user, code_value)
         if not success:
-            message_text = "Неверный код." if reason == "invalid_code" else "Этот код уже использован."
             await db.log_action(session, user.user_id, code_value, "failure", reason, "code_entry")
             await session.commit()
-            await message.answer(message_text)
+            await message.answer(code_failure_text(reason))
             return
         await db.log_action(session, user.user_id, code_value, "success", "code_accepted", "code_entry")
         await session.commit()
-        await message.answer(
-            f"Код принят! Начислено {points} балл(ов). Ваш счёт: {user.total_points}."
-        )
+        await message.answer(code_accepted_text(points, user.total_points))
@@ -1,13 +1,17 @@
 import asyncio
 import logging
 import os
+import time
 
 from aiogram import Bot, Dispatcher
 from dotenv import load_dotenv
 
 from . import db
+from .catchup import catch_up
 from .handlers import router
 
+logger = logging.getLogger(__name__)
+
 
 async def main() -> None:
     load_dotenv()
@@ -15,12 +19,24 @@ async def main() -> None:
     token = os.getenv("BOT_TOKEN")
     if not token:
         raise RuntimeError("BOT_TOKEN не задан в .env")
-    await db.init_db()
-    async with db.SessionLocal() as session:
-        await db.ensure_active_season(session)
+    timings = {}
+    started = time.perf_counter()
+    created = await db.init_db()
+    timings["schema_create" if created else "schema_skip"] = time.perf_counter() - started
+    phase_started = time.perf_counter()
+    await db.warm_up()
+    timings["warm_up"] = time.perf_counter() - phase_started
     bot = Bot(token=token)
     dispatcher = Dispatcher()
     dispatcher.include_router(router)
+    timings["total"] = time.perf_counter() - started
+    logger.info(
+        "Startup finished: %s",
+        ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in timings.items()),
+    )
+    started = time.perf_counter()
+    if await catch_up(bot, dispatcher):
+        logger.info("Catch-up finished in %.1fms", (time.perf_counter() - started) * 1000)
     await dispatcher.start_polling(bot)
 
 
@@ -8,11 +8,47 @@ FAILURE_COOLDOWN = timedelta(seconds=30)
 BRUTE_FORCE_LIMIT = 5
 BRUTE_FORCE_WINDOW = timedelta(minutes=1)
 
+REGISTER_USAGE_TEXT = "Укажите ФИО: /register Иванов Иван Иванович"
+REGISTERED_TEXT = (
+    "Регистрация завершена! Данные менять нельзя, поэтому проверьте ФИО.\n"
+    "Теперь отправляйте коды для начисления баллов."
+)
+ALREADY_REGISTERED_TEXT = "Вы уже зарегистрированы."
+NOT_REGISTERED_TEXT = "Сначала зарегистрируйтесь через /register."
 
-def compute_cooldown(last_action: Optional[History]) -> Optional[timedelta]:
+CODE_FAILURE_TEXTS = {
+    "not_registered": NOT_REGISTERED_TEXT,
+    "no_active_season": "Сезон не активен. Ожидайте запуска нового сезона.",
+    "bruteforce_limit": "Слишком много неудачных попыток. Попробуйте позже.",
+    "invalid_code": "Неверный код.",
+    "code_used": "Этот код уже использован.",
+}
+
+
+def format_timedelta(delta) -> str:
+    seconds = int(delta.total_seconds())
+    minutes, seconds = divmod(seconds, 60)
+    if minutes:
+        return f"{minutes} мин {seconds} сек"
+    return f"{seconds} сек"
+
+
+def code_failure_text(reason: str, cooldown: Optional[timedelta] = None) -> str:
+    if reason == "cooldown":
+        return f"Попробуйте позже. Осталось ждать: {format_timedelta(cooldown)}."
+    return CODE_FAILURE_TEXTS[reason]
+
+
+def code_accepted_text(points: int, total_points: int) -> str:
+    return f"Код принят! Начислено {points} балл(ов). Ваш счёт: {total_points}."
+
+
+def compute_cooldown(
+    last_action: Optional[History], now: Optional[datetime] = None
+) -> Optional[timedelta]:
     if not last_action:
         return None
-    now = datetime.utcnow()
+    now = now or datetime.utcnow()
     delta = now - last_action.timestamp
     if last_action.result == "success":
         remaining = SUCCESS_COOLDOWN - delta
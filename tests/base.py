@@ -0,0 +1,24 @@
+import unittest
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from bot import db
+
+
+class DbTestCase(unittest.IsolatedAsyncioTestCase):
+    """Points bot.db at a fresh in-memory SQLite database and a cold cache."""
+
+    async def asyncSetUp(self) -> None:
+        self.original = (db.engine, db.SessionLocal, db.hot)
+        db.engine = create_async_engine(
+            "sqlite+aiosqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        db.SessionLocal = async_sessionmaker(bind=db.engine, expire_on_commit=False)
+        db.hot = db.HotState()
+
+    async def asyncTearDown(self) -> None:
+        await db.engine.dispose()
+        db.engine, db.SessionLocal, db.hot = self.original
@@ -0,0 +1,241 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message, Update, User
+
+from bot import catchup, db
+from bot.utils import (
+    REGISTERED_TEXT,
+    SUCCESS_COOLDOWN,
+    code_accepted_text,
+    code_failure_text,
+)
+
+from .base import DbTestCase
+
+START = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_update(update_id: int, user_id: int, text: str, seconds: float) -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=START + timedelta(seconds=seconds),
+            chat=Chat(id=user_id, type="private"),
+            from_user=User(id=user_id, is_bot=False, first_name="Test"),
+            text=text,
+        ),
+    )
+
+
+class ResolveBatchTest(DbTestCase):
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        await db.init_db()
+        await db.warm_up()
+
+    async def register(self, *user_ids: int) -> None:
+        async with db.SessionLocal() as session:
+            for user_id in user_ids:
+                await db.register_user(session, user_id, f"User {user_id}")
+
+    async def add_codes(self, **codes: int) -> None:
+        async with db.SessionLocal() as session:
+            for code, points in codes.items():
+                await db.add_code(session, code, points)
+
+    async def test_cooldown_uses_message_time(self) -> None:
+        await self.register(1)
+        await self.add_codes(A=1, B=1, C=1)
+        replies = await catchup.resolve_batch(
+            [
+                make_update(1, 1, "A", 0),
+                make_update(2, 1, "B", 60),
+                make_update(3, 1, "C", SUCCESS_COOLDOWN.total_seconds() + 1),
+            ]
+        )
+        self.assertEqual(replies[0], (1, code_accepted_text(1, 1)))
+        self.assertEqual(
+            replies[1], (1, code_failure_text("cooldown", SUCCESS_COOLDOWN - timedelta(seconds=60)))
+        )
+        self.assertEqual(replies[2], (1, code_accepted_text(1, 2)))
+
+    async def test_bruteforce_limit(self) -> None:
+        await self.register(1)
+        seconds = [0, 1, 2, 3, 4, 35]
+        replies = await catchup.resolve_batch(
+            [make_update(index, 1, "X", second) for index, second in enumerate(seconds, start=1)]
+        )
+        # One invalid code and four cooldown rejections make five failures within a minute.
+        self.assertEqual(replies[0], (1, code_failure_text("invalid_code")))
+        self.assertTrue(all("Попробуйте позже" in answer for _, answer in replies[1:5]))
+        self.assertEqual(replies[5], (1, code_failure_text("bruteforce_limit")))
+
+    async def test_register_then_redeem(self) -> None:
+        await self.add_codes(A=2)
+        replies = await catchup.resolve_batch(
+            [make_update(1, 5, "/register Петров Пётр", 0), make_update(2, 5, "A", 1)]
+        )
+        self.assertEqual(replies, [(5, REGISTERED_TEXT), (5, code_accepted_text(2, 2))])
+        async with db.SessionLocal() as session:
+            user = await db.get_user(session, 5)
+        self.assertEqual(user.total_points, 2)
+        self.assertTrue(db.hot.codes["A"])
+
+    async def test_same_code_goes_to_earliest_message(self) -> None:
+        await self.register(1, 2)
+        await self.add_codes(A=1)
+        replies = await catchup.resolve_batch(
+            [
+                make_update(1, 1, "/register Again", 0),
+                make_update(2, 1, "A", 20),
+                make_update(3, 2, "A", 10),
+            ]
+        )
+        self.assertIn((2, code_accepted_text(1, 1)), replies)
+        self.assertIn((1, code_failure_text("code_used")), replies)
+
+    def test_dedupe_by_update_id(self) -> None:
+        updates = [
+            make_update(3, 1, "B", 1),
+            make_update(2, 1, "A", 0),
+            make_update(2, 1, "A", 0),
+            make_update(1, 1, "C", 0),
+        ]
+        self.assertEqual([update.update_id for update in catchup.dedupe_updates(updates)], [1, 2, 3])
+        self.assertEqual(
+            [update.update_id for update in catchup.dedupe_updates(updates, after=1)], [2, 3]
+        )
+
+
+class IsBatchableTest(unittest.TestCase):
+    def test_codes_and_register_are_batched(self) -> None:
+        self.assertTrue(catchup.is_batchable(make_update(1, 1, "ABC", 0)))
+        self.assertTrue(catchup.is_batchable(make_update(2, 1, "/register Иванов", 0)))
+
+    def test_other_commands_and_mentions_go_to_dispatcher(self) -> None:
+        self.assertFalse(catchup.is_batchable(make_update(1, 1, "/myscore", 0)))
+        self.assertFalse(catchup.is_batchable(make_update(2, 1, "/register@OtherBot Иванов", 0)))
+
+
+class SendRepliesTest(unittest.IsolatedAsyncioTestCase):
+    def rate_limited(self) -> TelegramRetryAfter:
+        return TelegramRetryAfter(SendMessage(chat_id=1, text="x"), "Too Many Requests", 5)
+
+    async def test_retries_after_rate_limit(self) -> None:
+        bot = mock.AsyncMock()
+        bot.send_message.side_effect = [self.rate_limited(), None]
+        with mock.patch("asyncio.sleep") as sleep:
+            await catchup.send_replies(bot, [(1, "x")])
+        self.assertEqual(bot.send_message.await_count, 2)
+        sleep.assert_awaited_once_with(5)
+
+    async def test_logs_dropped_replies(self) -> None:
+        bot = mock.AsyncMock()
+        bot.send_message.side_effect = [self.rate_limited()] * catchup.SEND_ATTEMPTS + [
+            RuntimeError("blocked")
+        ]
+        with mock.patch("asyncio.sleep") as sleep, self.assertLogs(catchup.logger) as logs:
+            await catchup.send_replies(bot, [(1, "x"), (2, "y")])
+        self.assertEqual(sleep.await_count, catchup.SEND_ATTEMPTS - 1)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn("chat 1", logs.output[0])
+        self.assertIn("chat 2", logs.output[1])
+
+
+class CatchUpTest(unittest.IsolatedAsyncioTestCase):
+    """Drives catch_up with a fake get_updates, dispatcher and batch resolver."""
+
+    async def asyncSetUp(self) -> None:
+        self.events: list[tuple] = []
+        self.offsets: list[tuple] = []
+        self.pages: list = []
+        self.bot = mock.AsyncMock()
+        self.bot.get_updates.side_effect = self.get_updates
+        self.dispatcher = mock.AsyncMock()
+        self.dispatcher.feed_update.side_effect = self.feed_update
+        self.failing_updates: set[int] = set()
+        for target, value in (
+            ("CATCHUP_THRESHOLD", 3),
+            ("FETCH_RETRY_DELAY", 0),
+            ("resolve_batch", self.resolve_batch),
+            ("send_replies", mock.AsyncMock()),
+        ):
+            patcher = mock.patch.object(catchup, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def get_updates(self, offset=None, timeout=None, limit=None):
+        self.offsets.append((offset, limit))
+        page = self.pages.pop(0) if self.pages else []
+        if isinstance(page, Exception):
+            raise page
+        return page
+
+    async def feed_update(self, bot, update):
+        self.events.append(("feed", update.update_id))
+        if update.update_id in self.failing_updates:
+            raise RuntimeError("handler failed")
+
+    async def resolve_batch(self, updates):
+        self.events.append(("batch", [update.update_id for update in updates]))
+        return []
+
+    def codes(self, *update_ids: int) -> list[Update]:
+        return [make_update(update_id, 1, f"C{update_id}", update_id) for update_id in update_ids]
+
+    async def test_drains_pages_and_confirms_after_processing(self) -> None:
+        self.pages = [self.codes(1, 2, 3), self.codes(4, 5, 6), self.codes(7)]
+        self.assertEqual(await catchup.catch_up(self.bot, self.dispatcher), 6)
+        self.assertEqual(self.offsets, [(None, 100), (4, 100), (7, 100)])
+        self.assertEqual(self.events, [("batch", [1, 2, 3]), ("batch", [4, 5, 6])])
+
+    async def test_small_backlog_is_left_for_polling(self) -> None:
+        self.pages = [self.codes(1, 2)]
+        self.assertEqual(await catchup.catch_up(self.bot, self.dispatcher), 0)
+        self.assertEqual(self.offsets, [(None, 100)])
+        self.assertEqual(self.events, [])
+
+    async def test_flushes_batch_before_other_updates(self) -> None:
+        page = self.codes(1, 2)
+        page.append(make_update(3, 1, "/myscore", 3))
+        page.extend(self.codes(4))
+        self.pages = [page]
+        self.assertEqual(await catchup.catch_up(self.bot, self.dispatcher), 4)
+        self.assertEqual(self.events, [("batch", [1, 2]), ("feed", 3), ("batch", [4])])
+        self.assertEqual(self.offsets, [(None, 100), (5, 100)])
+
+    async def test_handler_error_does_not_stop_catch_up(self) -> None:
+        page = self.codes(1, 2)
+        page.append(make_update(3, 1, "/new_season", 3))
+        page.extend(self.codes(4))
+        self.pages = [page, self.codes(5, 6, 7)]
+        self.failing_updates = {3}
+        with self.assertLogs(catchup.logger):
+            self.assertEqual(await catchup.catch_up(self.bot, self.dispatcher), 7)
+        self.assertEqual(self.offsets, [(None, 100), (5, 100), (8, 100)])
+        self.assertIn(("batch", [5, 6, 7]), self.events)
+
+    async def test_batch_failure_confirms_only_handled_updates(self) -> None:
+        self.pages = [self.codes(1) + [make_update(2, 1, "/myscore", 2)] + self.codes(3, 4)]
+        failing = mock.AsyncMock(side_effect=[[], RuntimeError("commit failed")])
+        with mock.patch.object(catchup, "resolve_batch", failing), self.assertLogs(catchup.logger):
+            self.assertEqual(await catchup.catch_up(self.bot, self.dispatcher), 2)
+        self.assertEqual(self.events, [("feed", 2)])
+        self.assertEqual(self.offsets, [(None, 100), (3, 1)])
+
+    async def test_fetch_errors_fall_back_to_polling(self) -> None:
+        self.pages = [ConnectionError("offline")] * catchup.FETCH_ATTEMPTS
+        with self.assertLogs(catchup.logger):
+            self.assertEqual(await catchup.catch_up(self.bot, self.dispatcher), 0)
+        self.assertEqual(len(self.offsets), catchup.FETCH_ATTEMPTS)
+
+    async def test_fetch_error_is_retried(self) -> None:
+        self.pages = [ConnectionError("offline"), self.codes(1, 2, 3)]
+        with self.assertLogs(catchup.logger):
+            self.assertEqual(await catchup.catch_up(self.bot, self.dispatcher), 3)
+        self.assertEqual(self.offsets, [(None, 100), (None, 100), (4, 100)])
@@ -0,0 +1,98 @@
+from sqlalchemy import text
+
+from bot import db
+
+from .base import DbTestCase
+
+
+class InitDbTest(DbTestCase):
+    async def test_fresh_database_has_no_fingerprint(self) -> None:
+        self.assertIsNone(await db.get_schema_fingerprint())
+        self.assertTrue(await db.init_db())
+        self.assertEqual(await db.get_schema_fingerprint(), db.schema_fingerprint())
+
+    async def test_matching_fingerprint_skips_create_all(self) -> None:
+        await db.init_db()
+        async with db.engine.begin() as conn:
+            await conn.execute(text("DROP TABLE winners"))
+        self.assertFalse(await db.init_db())
+        async with db.engine.connect() as conn:
+            tables = await conn.run_sync(lambda sync_conn: sync_conn.dialect.get_table_names(sync_conn))
+        self.assertNotIn("winners", tables)
+
+    async def test_stale_fingerprint_runs_create_all(self) -> None:
+        await db.init_db()
+        async with db.SessionLocal() as session:
+            await session.merge(db.SchemaMeta(key=db.SCHEMA_FINGERPRINT_KEY, value="stale"))
+            await session.commit()
+        self.assertTrue(await db.init_db())
+        self.assertEqual(await db.get_schema_fingerprint(), db.schema_fingerprint())
+
+
+class HotStateTest(DbTestCase):
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        await db.init_db()
+        await db.warm_up()
+
+    async def test_warm_up_loads_active_season(self) -> None:
+        self.assertTrue(db.hot.warm)
+        self.assertIsNotNone(db.hot.active_season_id)
+        async with db.SessionLocal() as session:
+            season = await db.get_active_season(session)
+        self.assertEqual(season.season_id, db.hot.active_season_id)
+
+    async def test_add_and_delete_code(self) -> None:
+        async with db.SessionLocal() as session:
+            await db.add_code(session, "ABC", 1)
+            self.assertEqual(db.hot.codes, {"ABC": False})
+            await db.delete_code(session, "ABC")
+        self.assertEqual(db.hot.codes, {})
+
+    async def test_apply_code_marks_used_and_invalidates_leaderboard(self) -> None:
+        async with db.SessionLocal() as session:
+            await db.register_user(session, 1, "Иванов")
+            await db.add_code(session, "ABC", 2)
+            self.assertEqual(await db.get_ranking(session, 1), (1, 0))
+            user = await db.get_user(session, 1)
+            self.assertEqual(await db.apply_code(session, user, "ABC"), (True, "ok", 2))
+            self.assertIsNone(db.hot.leaderboard)
+            self.assertEqual(await db.apply_code(session, user, "ABC"), (False, "code_used", 0))
+            self.assertEqual(await db.get_ranking(session, 1), (1, 2))
+        self.assertTrue(db.hot.codes["ABC"])
+
+    async def test_stale_leaderboard_is_not_cached(self) -> None:
+        async with db.SessionLocal() as session:
+            await db.register_user(session, 1, "Иванов")
+            generation = db.hot.leaderboard_generation
+            db.invalidate_leaderboard()
+            db.hot.leaderboard_generation = generation
+            # Simulate a write committing while the leaderboard query is in flight.
+            original_execute = session.execute
+
+            async def execute(*args, **kwargs):
+                result = await original_execute(*args, **kwargs)
+                db.invalidate_leaderboard()
+                return result
+
+            session.execute = execute
+            self.assertEqual(await db.load_leaderboard(session), [(1, 0)])
+        self.assertIsNone(db.hot.leaderboard)
+
+    async def test_stop_and_start_season(self) -> None:
+        async with db.SessionLocal() as session:
+            await db.add_code(session, "ABC", 1)
+            await db.stop_season(session)
+            self.assertIsNone(db.hot.active_season_id)
+            self.assertIsNone(await db.get_active_season(session))
+            season = await db.start_new_season(session)
+        self.assertEqual(db.hot.active_season_id, season.season_id)
+        self.assertEqual(db.hot.codes, {})
+        self.assertIsNone(db.hot.leaderboard)
+
+    async def test_set_admin_session(self) -> None:
+        async with db.SessionLocal() as session:
+            self.assertFalse(await db.is_admin_session(session, 7))
+            await db.set_admin_session(session, 7)
+            self.assertTrue(await db.is_admin_session(session, 7))
+        self.assertIn(7, db.hot.admin_ids)